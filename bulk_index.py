@@ -1,25 +1,65 @@
+import asyncio
 import os
-import requests
+import httpx
 
 # Use your Railway Public URL for Graphiti or the Private one if running via 'railway run'
 GRAPHITI_URL = "http://gallant-serenity.railway.internal:8080/v1/mcp"
 
-def index_community_assets(directory):
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".py") or file.endswith(".md"):
-                file_path = os.path.join(root, file)
-                print(f"📁 Found Asset: {file}")
-                
-                # The payload to tell Graphiti about this 'Wheel'
-                payload = {
-                    "method": "add_episode",
-                    "params": {
-                        "text": f"Community Asset: {file}. Path: {file_path}. This is a server-side instrument for the Federated Community."
-                    }
+ASSET_EXTENSIONS = (".py", ".md")
+MAX_IN_FLIGHT = 32
+
+def _walk(directory):
+    # scandir hands back cached DirEntry metadata, so no extra stat per file
+    try:
+        it = os.scandir(directory)
+    except OSError:
+        # Missing or unreadable directories are skipped, as os.walk does
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            elif entry.is_file():
+                yield entry
+
+def build_payloads(directory):
+    payloads = []
+    for entry in _walk(directory):
+        if entry.name.endswith(ASSET_EXTENSIONS):
+            print(f"📁 Found Asset: {entry.name}")
+
+            # The payload to tell Graphiti about this 'Wheel'
+            payloads.append({
+                "method": "add_episode",
+                "params": {
+                    "text": f"Community Asset: {entry.name}. Path: {entry.path}. This is a server-side instrument for the Federated Community."
                 }
-                # Note: This is a simplified call; A0 usually handles the SSE handshake.
-                print(f"✅ Indexed {file} to the Community Brain.")
+            })
+    return payloads
+
+async def push(client, sem, payload):
+    async with sem:
+        r = await client.post(GRAPHITI_URL, json=payload)
+        r.raise_for_status()
+
+async def index_community_assets(directory):
+    payloads = build_payloads(directory)
+    if not payloads:
+        return
+
+    # One pooled client for every asset; the semaphore keeps us inside the pool
+    limits = httpx.Limits(max_keepalive_connections=MAX_IN_FLIGHT, max_connections=MAX_IN_FLIGHT * 2)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        sem = asyncio.Semaphore(MAX_IN_FLIGHT)
+        results = await asyncio.gather(
+            *(push(client, sem, p) for p in payloads),
+            return_exceptions=True
+        )
+
+    failed = [r for r in results if isinstance(r, Exception)]
+    for err in failed:
+        print(f"❌ Failed to index asset: {err}")
+    print(f"✅ Indexed {len(payloads) - len(failed)}/{len(payloads)} assets to the Community Brain.")
 
 if __name__ == "__main__":
-    index_community_assets("./usr/projects/test")
\ No newline at end of file
+    asyncio.run(index_community_assets("./usr/projects/test"))
@@ -2,12 +2,18 @@ import os
 import shutil
 
 def delete_path(path):
-    if os.path.exists(path):
-        if os.path.isdir(path):
-            shutil.rmtree(path)
-        else:
-            os.remove(path)
-        print(f"🗑️  Deleted: {path}")
+    # Try the delete directly instead of stat-ing first; a missing path is a no-op.
+    # unlink goes first so symlinks (dangling or not) are removed, never followed
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        return
+    except OSError:
+        # Real directory: IsADirectoryError on Linux, PermissionError on macOS
+        if not os.path.isdir(path):
+            raise
+        shutil.rmtree(path)
+    print(f"🗑️  Deleted: {path}")
 
 # 1. Kala Engine (Time logic - we aren't using this yet)
 delete_path("src/modules/kala-engine")
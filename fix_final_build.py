@@ -2,8 +2,23 @@ import os
 
 def write_file(path, content):
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w") as f:
-        f.write(content.strip())
+    data = content.strip().encode("utf-8")
+    # Leave identical files untouched so their mtime doesn't trigger a tsc rebuild
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                print(f"= Unchanged: {path}")
+                return
+    except FileNotFoundError:
+        pass
+    # Raw fd write: one syscall, no TextIOWrapper/newline translation
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
     print(f"✅ Fixed: {path}")
 
 def delete_file(path):
@@ -57,18 +72,29 @@ async function startServer() {
   // ROUTES
   // ---------------------------------------------------------
 
-  // REAL Health Check
+  // REAL Health Check (DB probe result cached for HEALTH_TTL_MS)
+  const HEALTH_TTL_MS = 5000;
+  let lastHealth = { t: 0, ok: false, err: null as any };
+
   app.get('/health', async (req: Request, res: Response) => {
-    try {
-      await connection.execute("RETURN 1");
-      res.json({ 
-        status: 'healthy', 
+    if (performance.now() - lastHealth.t >= HEALTH_TTL_MS) {
+      try {
+        await connection.executeRead("RETURN 1");
+        lastHealth = { t: performance.now(), ok: true, err: null };
+      } catch (e) {
+        console.error("Health Check Failed:", e);
+        lastHealth = { t: performance.now(), ok: false, err: e };
+      }
+    }
+
+    if (lastHealth.ok) {
+      res.json({
+        status: 'healthy',
         services: { database: 'connected' },
         uptime: process.uptime()
       });
-    } catch (e) {
-      console.error("Health Check Failed:", e);
-      res.status(503).json({ status: 'unhealthy', error: String(e) });
+    } else {
+      res.status(503).json({ status: 'unhealthy', error: String(lastHealth.err) });
     }
   });
 
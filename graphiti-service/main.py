@@ -1,71 +1,373 @@
 # rebuilt 1767257934
 import os
+import asyncio
+import hashlib
 import logging
-from datetime import datetime
+import operator
+import random
+import time
+from datetime import datetime, timezone
+from importlib.metadata import version
+from typing import List, Optional
 from contextlib import asynccontextmanager
+from cachetools import TTLCache
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.security import APIKeyHeader
+from falkordb.asyncio import FalkorDB
+from pydantic import BaseModel
+from redis.asyncio import BlockingConnectionPool, Redis
 from graphiti_core import Graphiti
 from graphiti_core.driver.falkordb_driver import FalkorDriver
 from graphiti_core.nodes import EpisodeType
+from graphiti_core.utils.bulk_utils import RawEpisode
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("graphiti-service")
 
+# FALKORDB_URL wins when set (scheme, username and password included); HOST/PORT/PASSWORD are the fallback
+FALKORDB_URL = os.getenv("FALKORDB_URL")
 FALKORDB_HOST = os.getenv("FALKORDB_HOST", "falkordb.railway.internal")
 FALKORDB_PORT = int(os.getenv("FALKORDB_PORT", "6379"))
 FALKORDB_PASSWORD = os.getenv("FALKORDB_PASSWORD", "")
 FALKORDB_GRAPH = os.getenv("FALKORDB_GRAPH", "telepathy")
+FALKORDB_POOL_SIZE = int(os.getenv("FALKORDB_POOL_SIZE", "32"))
 API_KEY = os.getenv("GRAPHITI_API_KEY")
+# Tracks the installed graphiti-core so an upgrade rebuilds its indices/constraints;
+# bump the suffix to force a rebuild for changes of our own
+SCHEMA_VERSION = f"graphiti-core-{version('graphiti-core')}+1"
+SCHEMA_LOCK_KEY = f"graphiti:schema-lock:{FALKORDB_GRAPH}"
+SCHEMA_LOCK_ATTEMPTS = 30
+BATCH_MAX_WAIT = float(os.getenv("EPISODE_BATCH_MAX_WAIT", "0.02"))
+BATCH_MAX_SIZE = int(os.getenv("EPISODE_BATCH_MAX_SIZE", "256"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "100000"))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "300"))
+# Bumped on every write so each worker's local search cache can tell it's stale
+SEARCH_GENERATION_KEY = f"graphiti:search-generation:{FALKORDB_GRAPH}"
 
 graphiti = None
+batcher = None
+redis_client = None
+
+# Search results keyed on normalized query, stored as (generation, response)
+search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+# key -> [lock, callers using it]; the entry lives until its last caller is done
+search_locks = {}
+
+def search_cache_key(query, namespaces, limit):
+    raw = f"{query.lower().strip()}|{','.join(sorted(namespaces))}|{limit}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+_fact_and_score = operator.attrgetter("fact", "score")
+
+def search_row(r):
+    try:
+        fact, score = _fact_and_score(r)
+    except AttributeError:
+        # Plain EntityEdge results carry no score
+        fact, score = getattr(r, "fact", str(r)), 1.0
+    return {"content": fact, "score": score}
+
+async def search_generation():
+    return int(await redis_client.get(SEARCH_GENERATION_KEY) or 0)
+
+async def invalidate_search_cache():
+    """Bumps the shared generation so every worker drops its cached results, not just this one."""
+    await redis_client.incr(SEARCH_GENERATION_KEY)
+    search_cache.clear()
+
+def cached_search(key, generation):
+    entry = search_cache.get(key)
+    if entry is not None and entry[0] == generation:
+        return entry[1]
+    return None
+
+class EpisodeBatcher:
+    """Coalesces episodes that arrive within max_wait and writes them concurrently.
+
+    Each episode goes through add_episode rather than add_episode_bulk: the bulk
+    path skips edge invalidation and date extraction, which a live graph needs,
+    and one bad episode would fail every request in its batch.
+    """
+
+    def __init__(self, max_wait=0.02, max_batch=256):
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.task = None
+        # Flushes run as their own tasks so a slow batch never holds up the next one
+        self.flushes = set()
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        # Let in-flight writes land, then fail whatever is still queued so no request hangs
+        if self.flushes:
+            await asyncio.gather(*self.flushes, return_exceptions=True)
+        leftover = []
+        while not self.queue.empty():
+            leftover.append(self.queue.get_nowait())
+        self._fail(leftover)
+
+    async def submit(self, episode, group_id):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((group_id, episode, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            try:
+                while len(batch) < self.max_batch:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                self._fail(batch)
+                raise
+            flush = asyncio.create_task(self._flush(batch))
+            self.flushes.add(flush)
+            flush.add_done_callback(self.flushes.discard)
+
+    @staticmethod
+    def _fail(items):
+        for _, _, fut in items:
+            if not fut.done():
+                fut.set_exception(RuntimeError("Episode batcher stopped"))
+
+    async def _flush(self, batch):
+        groups = {}
+        for group_id, episode, fut in batch:
+            groups.setdefault(group_id, []).append((episode, fut))
+        await asyncio.gather(*(self._flush_group(g, items) for g, items in groups.items()))
+
+    async def _flush_group(self, group_id, items):
+        results = await asyncio.gather(
+            *(add_raw_episode(episode, group_id) for episode, _ in items),
+            return_exceptions=True
+        )
+        if any(not isinstance(r, Exception) for r in results):
+            try:
+                await invalidate_search_cache()
+            except Exception as e:
+                logger.error(f"Search cache invalidation failed: {e}")
+        # Each request succeeds or fails on its own episode
+        for (_, fut), result in zip(items, results):
+            if fut.done():
+                continue
+            if isinstance(result, Exception):
+                logger.error(f"Episode failed: {result}")
+                fut.set_exception(result)
+            else:
+                fut.set_result(None)
+
+_clock = [0.0, None]
+
+def now_dt():
+    """UTC reference time, shared by episodes that land within the same millisecond."""
+    t = time.time()
+    if t - _clock[0] > 0.001:
+        _clock[0] = t
+        _clock[1] = datetime.fromtimestamp(t, timezone.utc)
+    return _clock[1]
+
+def to_raw_episode(data: dict) -> RawEpisode:
+    return RawEpisode(
+        name=data.get("name", "episode"),
+        content=data.get("content", ""),
+        source=EpisodeType.text,
+        source_description=data.get("source", "agent"),
+        reference_time=now_dt()
+    )
+
+async def add_raw_episode(episode: RawEpisode, group_id):
+    await graphiti.add_episode(
+        name=episode.name,
+        episode_body=episode.content,
+        source=episode.source,
+        source_description=episode.source_description,
+        reference_time=episode.reference_time,
+        group_id=group_id
+    )
+
+async def schema_version():
+    records, _, _ = await graphiti.driver.execute_query(
+        "MATCH (m:_SchemaMeta) RETURN m.version AS version"
+    )
+    return records[0]["version"] if records else None
+
+class GatedFalkorDriver(FalkorDriver):
+    """FalkorDriver that leaves index/constraint DDL to ensure_schema.
+
+    The stock constructor schedules build_indices_and_constraints() whenever an
+    event loop is running, which would send the full DDL on every worker boot
+    regardless of the stored schema version.
+    """
+
+    async def build_indices_and_constraints(self, delete_existing=False):
+        pass
+
+async def build_schema():
+    await FalkorDriver.build_indices_and_constraints(graphiti.driver)
+    await graphiti.driver.execute_query("MERGE (m:_SchemaMeta) SET m.version = $v", v=SCHEMA_VERSION)
+
+async def ensure_schema(redis):
+    """Builds Graphiti indices once per SCHEMA_VERSION; replicas booting together wait on a shared lock."""
+    for _ in range(SCHEMA_LOCK_ATTEMPTS):
+        if await schema_version() == SCHEMA_VERSION:
+            logger.info(f"Schema {SCHEMA_VERSION} already in place, skipping index build")
+            return
+        if await redis.set(SCHEMA_LOCK_KEY, "1", nx=True, ex=120):
+            try:
+                await build_schema()
+            finally:
+                await redis.delete(SCHEMA_LOCK_KEY)
+            return
+        await asyncio.sleep(1 + random.random())
+    logger.warning("Timed out waiting for schema lock, building indices anyway")
+    await build_schema()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global graphiti
-    logger.info(f"Connecting to FalkorDB at {FALKORDB_HOST}:{FALKORDB_PORT}")
-    driver = FalkorDriver(
-        host=FALKORDB_HOST,
-        port=FALKORDB_PORT,
-        password=FALKORDB_PASSWORD if FALKORDB_PASSWORD else None,
+    global graphiti, batcher, redis_client
+    # Shared pool so concurrent requests don't queue on a single socket
+    pool_kwargs = dict(
+        max_connections=FALKORDB_POOL_SIZE,
+        socket_keepalive=True,
+        health_check_interval=30,
+        decode_responses=True
+    )
+    if FALKORDB_URL:
+        logger.info("Connecting to FalkorDB via FALKORDB_URL")
+        pool = BlockingConnectionPool.from_url(FALKORDB_URL, **pool_kwargs)
+    else:
+        logger.info(f"Connecting to FalkorDB at {FALKORDB_HOST}:{FALKORDB_PORT}")
+        pool = BlockingConnectionPool(
+            host=FALKORDB_HOST,
+            port=FALKORDB_PORT,
+            password=FALKORDB_PASSWORD if FALKORDB_PASSWORD else None,
+            **pool_kwargs
+        )
+    driver = GatedFalkorDriver(
+        falkor_db=FalkorDB(connection_pool=pool),
         database=FALKORDB_GRAPH
     )
     graphiti = Graphiti(graph_driver=driver)
-    await graphiti.build_indices_and_constraints()
+    redis_client = Redis(connection_pool=pool)
+    await ensure_schema(redis_client)
     logger.info("Graphiti connected!")
+    batcher = EpisodeBatcher(max_wait=BATCH_MAX_WAIT, max_batch=BATCH_MAX_SIZE)
+    batcher.start()
     yield
+    await batcher.stop()
+    await pool.disconnect()
+
+# Declared response models let FastAPI serialize straight through pydantic-core
+class HealthResponse(BaseModel):
+    status: str
+    graphiti_connected: bool
+    graph: str
+
+class EpisodeResponse(BaseModel):
+    status: str
+    count: Optional[int] = None
+
+class SearchHit(BaseModel):
+    content: str
+    score: Optional[float] = None
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit]
 
 app = FastAPI(title="Telepathy Service", lifespan=lifespan)
 
-@app.get("/health")
+@app.get("/health", response_model=HealthResponse)
 async def health_check():
     return {"status": "ok", "graphiti_connected": graphiti is not None, "graph": FALKORDB_GRAPH}
 
-@app.post("/episodes")
+@app.post("/episodes", response_model=EpisodeResponse, response_model_exclude_none=True)
 async def add_episode(data: dict):
     try:
-        await graphiti.add_episode(
-            name=data.get("name", "episode"),
-            episode_body=data.get("content", ""),
-            source=EpisodeType.text,
-            source_description=data.get("source", "agent"),
-            reference_time=datetime.now(),
-            group_id=data.get("namespace", "global")
-        )
+        await batcher.submit(to_raw_episode(data), data.get("namespace", "global"))
         return {"status": "ok"}
     except Exception as e:
         logger.error(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/search")
+@app.post("/episodes/batch", response_model=EpisodeResponse)
+async def add_episodes(data: dict):
+    episodes = data.get("episodes", [])
+    try:
+        await asyncio.gather(*(
+            batcher.submit(to_raw_episode(ep), ep.get("namespace", data.get("namespace", "global")))
+            for ep in episodes
+        ))
+        return {"status": "ok", "count": len(episodes)}
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/search", response_model=SearchResponse)
 async def search(data: dict):
+    query = data.get("query", "")
+    namespaces = data.get("namespaces", ["global"])
+    limit = data.get("limit", 10)
+    key = search_cache_key(query, namespaces, limit)
+
+    # One caller per key does the lookup; concurrent duplicates wait for its result
+    entry = search_locks.get(key)
+    if entry is None:
+        entry = search_locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
     try:
-        results = await graphiti.search(
-            query=data.get("query", ""),
-            group_ids=data.get("namespaces", ["global"]),
-            num_results=data.get("limit", 10)
-        )
-        return {"results": [{"content": r.fact, "score": r.score} for r in results]}
+        generation = await search_generation()
+        cached = cached_search(key, generation)
+        if cached is not None:
+            return cached
+
+        async with entry[0]:
+            cached = cached_search(key, generation)
+            if cached is not None:
+                return cached
+            results = await graphiti.search(
+                query=query,
+                group_ids=namespaces,
+                num_results=limit
+            )
+            response = {"results": [search_row(r) for r in results]}
+            # A write that landed mid-search may not be reflected; don't cache it
+            if await search_generation() == generation:
+                search_cache[key] = (generation, response)
+            return response
     except Exception as e:
         logger.error(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Counting users, not checking locked(): a woken waiter hasn't re-acquired yet
+        entry[1] -= 1
+        if entry[1] == 0:
+            del search_locks[key]
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", "4")),
+        loop="uvloop",
+        http="httptools",
+        log_level="warning"
+    )
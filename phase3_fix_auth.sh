@@ -13,6 +13,7 @@ echo "🐍 Updating graphiti-service/main.py..."
 cat << 'PY_MAIN' > graphiti-service/main.py
 import os
 import logging
+from functools import lru_cache
 from urllib.parse import urlparse
 from fastapi import FastAPI, Request, HTTPException, Security
 from fastapi.security import APIKeyHeader
@@ -35,6 +36,7 @@ API_KEY = os.getenv("GRAPHITI_API_KEY")
 # ---------------------------------------------------------
 # CONNECTION LOGIC
 # ---------------------------------------------------------
+@lru_cache(maxsize=8)
 def get_connection_params(url_str):
     """
     Robust parsing for Redis/FalkorDB URLs.
@@ -56,16 +58,18 @@ def get_connection_params(url_str):
 # Note: Actual Graphiti init depends on library version. 
 # We assume it takes host/port/credentials or a client.
 conn_params = get_connection_params(FALKORDB_URL)
-logger.info(f"Connecting to Graphiti at {conn_params['host']}:{conn_params['port']}...")
-
-# We initialize Graphiti with the specific graph name
-client = Graphiti(
+# Resolved once at import so nothing downstream re-derives them
+GRAPH_KWARGS = dict(
     host=conn_params['host'],
     port=conn_params['port'],
-    password=conn_params['password'],
-    username=conn_params['username'],
+    password=conn_params.get('password'),
+    username=conn_params.get('username'),
     graph_name=FALKORDB_GRAPH
 )
+logger.info(f"Connecting to Graphiti at {conn_params['host']}:{conn_params['port']}...")
+
+# We initialize Graphiti with the specific graph name
+client = Graphiti(**GRAPH_KWARGS)
 
 # ---------------------------------------------------------
 # SECURITY MIDDLEWARE
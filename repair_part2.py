@@ -2,8 +2,23 @@ import os
 
 def write_file(path, content):
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w") as f:
-        f.write(content.strip())
+    data = content.strip().encode("utf-8")
+    # Leave identical files untouched so their mtime doesn't trigger a tsc rebuild
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                print(f"= Unchanged: {path}")
+                return
+    except FileNotFoundError:
+        pass
+    # Raw fd write: one syscall, no TextIOWrapper/newline translation
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
     print(f"✅ Fixed: {path}")
 
 # ==============================================================================
@@ -0,0 +1,90 @@
+import { EntityResolutionEngine } from '..';
+import type { NodeCrud } from '../../graph-core/crud';
+
+// Fulfills every group with its row IDs, except labels listed in `failing`
+const fakeUpsertNodeGroups = (failing: string[] = []) =>
+  jest.fn(async (groups: Array<[string, Array<{ id: string }>]>): Promise<PromiseSettledResult<string[]>[]> =>
+    groups.map(([label, rows]) => failing.includes(label)
+      ? { status: 'rejected' as const, reason: new Error(`Invalid node label: ${label}`) }
+      : { status: 'fulfilled' as const, value: rows.map((r) => r.id) })
+  );
+
+describe('EntityResolutionEngine', () => {
+  describe('Composite IDs', () => {
+    it('should slug agency and title exactly like the legacy regex', async () => {
+      const upsertNodeGroups = fakeUpsertNodeGroups();
+      const engine = new EntityResolutionEngine({ upsertNodeGroups } as unknown as NodeCrud);
+      const title = 'Rural Health—Café Grants (FY25)';
+      const agencyName = 'Dept. of Ag';
+
+      const id = await engine.resolveEntity({ entityType: 'Opportunity', properties: { title, agencyName } });
+
+      const legacy = (s: string) => s.replace(/[^a-z0-9]/gi, '_').toLowerCase();
+      expect(id).toBe(`${legacy(agencyName)}_${legacy(title)}`);
+      expect(id).toBe('dept__of_ag_rural_health_caf__grants__fy25_');
+    });
+  });
+
+  describe('Tick batching', () => {
+    it('should send keyed resolves from the same tick in one round-trip', async () => {
+      const upsertNodeGroups = fakeUpsertNodeGroups();
+      const engine = new EntityResolutionEngine({ upsertNodeGroups } as unknown as NodeCrud);
+
+      const ids = await Promise.all([
+        engine.resolveEntity({ entityType: 'Opportunity', properties: { opportunityId: 'OPP-1' } }),
+        engine.resolveEntity({ entityType: 'Opportunity', properties: { opportunityId: 'OPP-2' } }),
+        engine.resolveEntity({ entityType: 'Funder', properties: { opportunityId: 'F-1' } }),
+      ]);
+
+      expect(ids).toEqual(['OPP-1', 'OPP-2', 'F-1']);
+      expect(upsertNodeGroups).toHaveBeenCalledTimes(1);
+      expect(upsertNodeGroups.mock.calls[0][0].map(([label]) => label)).toEqual(['Opportunity', 'Funder']);
+    });
+
+    it('should only reject the callers whose entity type failed', async () => {
+      const engine = new EntityResolutionEngine({ upsertNodeGroups: fakeUpsertNodeGroups(['Bad']) } as unknown as NodeCrud);
+
+      const [ok, bad] = await Promise.allSettled([
+        engine.resolveEntity({ entityType: 'Opportunity', properties: { opportunityId: 'OPP-1' } }),
+        engine.resolveEntity({ entityType: 'Bad', properties: { opportunityId: 'X-1' } }),
+      ]);
+
+      expect(ok).toEqual({ status: 'fulfilled', value: 'OPP-1' });
+      expect(bad.status).toBe('rejected');
+    });
+  });
+
+  describe('Bulk path', () => {
+    it('should route large batches through bulkMerge and keep input order', async () => {
+      const bulkMerge = jest.fn(async (_label: string, rows: Array<{ id?: string; properties: any }>) =>
+        rows.map((r) => r.id ?? r.properties.opportunityId)
+      );
+      const engine = new EntityResolutionEngine({ bulkMerge } as unknown as NodeCrud);
+      const reqs = Array.from({ length: 10 }, (_, i) => ({
+        entityType: i % 2 ? 'Funder' : 'Opportunity',
+        properties: { opportunityId: `K-${i}` },
+      }));
+
+      const ids = await engine.resolveEntities(reqs);
+
+      expect(ids).toEqual(reqs.map((r) => r.properties.opportunityId));
+      expect(bulkMerge).toHaveBeenCalledTimes(2);
+      expect(bulkMerge.mock.calls[0][1][0].id).toBeUndefined();
+    });
+  });
+
+  describe('Fallback IDs', () => {
+    it('should hand out distinct IDs for entities resolved in the same millisecond', async () => {
+      const createNode = jest.fn(async (_label: string, _props: object, id: string) => id);
+      const engine = new EntityResolutionEngine({ createNode } as unknown as NodeCrud);
+
+      const [a, b] = await Promise.all([
+        engine.resolveEntity({ entityType: 'Funder', properties: { name: 'A' } }),
+        engine.resolveEntity({ entityType: 'Funder', properties: { name: 'B' } }),
+      ]);
+
+      expect(a).toMatch(/^Funder_[0-9a-z]+_[0-9a-z]+$/);
+      expect(a).not.toBe(b);
+    });
+  });
+});
@@ -1,47 +1,175 @@
-import { NodeCrud } from '../graph-core/crud';
+import { MergeRow, NodeCrud, UpsertRow } from '../graph-core/crud';
+
+/**
+ * Lowercase ASCII alphanumerics and turn everything else into '_' in one
+ * pass. Same output as `s.replace(/[^a-z0-9]/gi, '_').toLowerCase()`.
+ */
+function slug(s: string): string {
+  const b = Buffer.allocUnsafe(s.length);
+  for (let i = 0; i < s.length; i++) {
+    const c = s.charCodeAt(i);
+    if (c >= 65 && c <= 90) b[i] = c + 32;
+    else if ((c >= 97 && c <= 122) || (c >= 48 && c <= 57)) b[i] = c;
+    else b[i] = 95;
+  }
+  return b.toString('latin1');
+}
+
+// Process start + monotonic counter: unique without a clock read or a DB check
+const ID_EPOCH = Date.now().toString(36);
+let idCounter = 0;
+
+function fallbackId(entityType: string): string {
+  return `${entityType}_${ID_EPOCH}_${(idCounter++).toString(36)}`;
+}
+
+// Batches above this go through NodeCrud.bulkMerge and let the server derive ids
+const BULK_MERGE_THRESHOLD = 8;
 
 interface ResolutionRequest {
   entityType: string;
   properties: Record<string, any>;
 }
 
+interface LabelGroup<R> {
+  rows: R[];
+  // Index of each row's request in the original batch
+  slots: number[];
+}
+
+/**
+ * Map per-label results back onto the requests they came from.
+ */
+function spreadGroupResults(
+  size: number,
+  groups: Array<[string, LabelGroup<unknown>]>,
+  results: PromiseSettledResult<string[]>[]
+): PromiseSettledResult<string>[] {
+  const settled = new Array<PromiseSettledResult<string>>(size);
+  groups.forEach(([, { slots }], g) => {
+    const result = results[g];
+    slots.forEach((slot, j) => {
+      settled[slot] = result.status === 'fulfilled' ? { status: 'fulfilled', value: result.value[j] } : result;
+    });
+  });
+  return settled;
+}
+
+interface PendingResolve {
+  req: ResolutionRequest;
+  resolve: (id: string) => void;
+  reject: (error: unknown) => void;
+}
+
 export class EntityResolutionEngine {
+  // Keyed resolves issued in the same tick, flushed together as one batch
+  private pending: PendingResolve[] = [];
+
   constructor(private nodeCrud: NodeCrud) {}
 
   async resolveEntity(req: ResolutionRequest): Promise<string> {
     const { entityType, properties } = req;
-    
-    // 1. Stable ID
-    if (properties.opportunityId) {
-      const stableId = properties.opportunityId;
-      const existing = await this.nodeCrud.getNode(stableId);
-      
-      if (existing) {
-        await this.nodeCrud.updateNode(stableId, properties);
-        return stableId;
-      }
-      const finalProps = { ...properties, id: stableId };
-      return await this.nodeCrud.createNode(entityType, finalProps);
-    }
+    const key = this.stableKey(properties);
 
-    // 2. Composite ID (Agency + Title)
-    if (properties.title && properties.agencyName) {
-       const safeTitle = properties.title.replace(/[^a-z0-9]/gi, '_').toLowerCase();
-       const safeAgency = properties.agencyName.replace(/[^a-z0-9]/gi, '_').toLowerCase();
-       const compositeId = `${safeAgency}_${safeTitle}`;
-       
-       const existing = await this.nodeCrud.getNode(compositeId);
-       if (existing) {
-         await this.nodeCrud.updateNode(compositeId, properties);
-         return compositeId;
-       }
-       const finalProps = { ...properties, id: compositeId };
-       return await this.nodeCrud.createNode(entityType, finalProps);
+    // 1. Stable ID / 2. Composite ID (Agency + Title)
+    // MERGE (no getNode check-then-write race), coalesced with any other
+    // keyed resolves from this tick into one pipelined round-trip
+    if (key) {
+      return new Promise<string>((resolve, reject) => {
+        if (this.pending.length === 0) queueMicrotask(() => this.flushPending());
+        this.pending.push({ req, resolve, reject });
+      });
     }
 
     // 3. Fallback
-    const newId = `${entityType}_${Date.now()}`;
-    await this.nodeCrud.createNode(entityType, { ...properties, id: newId });
+    const newId = fallbackId(entityType);
+    await this.nodeCrud.createNode(entityType, properties, newId);
     return newId;
   }
-}
\ No newline at end of file
+
+  /**
+   * Resolve many entities with one UNWIND MERGE per entity type, all sent
+   * in a single pipelined round-trip. Large batches take the bulkMerge path.
+   * Returned IDs line up with the input order.
+   */
+  async resolveEntities(reqs: ResolutionRequest[]): Promise<string[]> {
+    const settled = await this.settleEntities(reqs);
+    return settled.map((r) => {
+      if (r.status === 'rejected') throw r.reason;
+      return r.value;
+    });
+  }
+
+  /**
+   * Per-request outcome of a batch resolve. Entity types succeed or fail as a
+   * group, so one bad label only rejects the requests that carry it.
+   */
+  private async settleEntities(reqs: ResolutionRequest[]): Promise<PromiseSettledResult<string>[]> {
+    if (reqs.length > BULK_MERGE_THRESHOLD) {
+      const groups = this.groupByLabel<MergeRow>(reqs, ({ entityType, properties }) => {
+        const key = this.stableKey(properties);
+        // opportunityId-keyed rows are resolved by coalesce() in the MERGE
+        const serverKeyed = key !== null && key === properties.opportunityId && properties.id == null;
+        return { id: serverKeyed ? undefined : key ?? fallbackId(entityType), properties };
+      });
+      const results = await Promise.allSettled(
+        groups.map(([label, { rows }]) => this.nodeCrud.bulkMerge(label, rows))
+      );
+      return spreadGroupResults(reqs.length, groups, results);
+    }
+
+    const groups = this.groupByLabel<UpsertRow>(reqs, ({ entityType, properties }) => ({
+      id: this.stableKey(properties) ?? fallbackId(entityType),
+      properties,
+    }));
+    const results = await this.nodeCrud.upsertNodeGroups(groups.map(([label, { rows }]) => [label, rows]));
+    return spreadGroupResults(reqs.length, groups, results);
+  }
+
+  private groupByLabel<R>(
+    reqs: ResolutionRequest[],
+    toRow: (req: ResolutionRequest) => R
+  ): Array<[string, LabelGroup<R>]> {
+    const byLabel = new Map<string, LabelGroup<R>>();
+
+    reqs.forEach((req, i) => {
+      let group = byLabel.get(req.entityType);
+      if (!group) {
+        group = { rows: [], slots: [] };
+        byLabel.set(req.entityType, group);
+      }
+      group.rows.push(toRow(req));
+      group.slots.push(i);
+    });
+    return [...byLabel];
+  }
+
+  private async flushPending(): Promise<void> {
+    const batch = this.pending;
+    this.pending = [];
+    try {
+      const settled = await this.settleEntities(batch.map((p) => p.req));
+      batch.forEach((p, i) => {
+        const r = settled[i];
+        if (r.status === 'fulfilled') p.resolve(r.value);
+        else p.reject(r.reason);
+      });
+    } catch (error) {
+      // Only reached when the shared round-trip itself fails (e.g. no pooled client)
+      batch.forEach((p) => p.reject(error));
+    }
+  }
+
+  /**
+   * Deterministic ID for an entity: its opportunityId, else an agency/title
+   * composite. Null when neither is available.
+   */
+  private stableKey(properties: Record<string, any>): string | null {
+    if (properties.opportunityId) return properties.opportunityId;
+
+    if (properties.title && properties.agencyName) {
+      return `${slug(properties.agencyName)}_${slug(properties.title)}`;
+    }
+    return null;
+  }
+}
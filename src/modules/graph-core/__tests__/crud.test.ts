@@ -0,0 +1,182 @@
+import { NodeCrud } from '../crud';
+import type { GraphConnection } from '../connection';
+import { GenericNode } from '../property-codecs';
+
+const fakeConnection = (rows: any[] = [{ id: 'node-1' }]) => {
+  const sent: Array<{ query: string; params: any }> = [];
+  const execute = jest.fn(async (query: string, params: any = {}) => {
+    sent.push({ query, params });
+    return rows;
+  });
+  const pipeline = jest.fn(async (queries: Array<{ query: string; params?: any }>) =>
+    Promise.allSettled(queries.map((q) => execute(q.query, q.params)))
+  );
+  return { execute, sent, connection: { execute, executeRead: execute, pipeline } as unknown as GraphConnection };
+};
+
+describe('NodeCrud', () => {
+  describe('Query templates', () => {
+    it('should reuse identical query text for the same label', async () => {
+      const { sent, connection } = fakeConnection();
+      const crud = new NodeCrud(connection);
+
+      await crud.upsertNode('Grant', 'g1', { title: 'A' });
+      await crud.upsertNode('Grant', 'g2', { title: 'B' });
+
+      expect(sent[0].query).toBe(sent[1].query);
+      expect(sent[0].query).toContain('MERGE (n:Grant {id: $id})');
+    });
+
+    it('should reject labels that are not plain identifiers', async () => {
+      const { execute, connection } = fakeConnection();
+      const crud = new NodeCrud(connection);
+
+      await expect(crud.createNode('Grant) DETACH DELETE (x', { id: 'g1' })).rejects.toThrow('Invalid node label');
+      expect(execute).not.toHaveBeenCalled();
+    });
+  });
+
+  describe('Batch upsert', () => {
+    it('should send all rows of a label in one UNWIND query', async () => {
+      const { execute, sent, connection } = fakeConnection([{ id: 'g1' }, { id: 'g2' }]);
+      const crud = new NodeCrud(connection);
+
+      const ids = await crud.upsertNodes('Grant', [
+        { id: 'g1', properties: { title: 'A' } },
+        { id: 'g2', properties: { title: 'B', tags: ['x'] } },
+      ]);
+
+      expect(ids).toEqual(['g1', 'g2']);
+      expect(execute).toHaveBeenCalledTimes(1);
+      const { query, params } = sent[0];
+      expect(query).toContain('UNWIND $rows AS r');
+      expect(params.rows).toEqual([
+        { id: 'g1', props: { title: 'A', id: 'g1' } },
+        { id: 'g2', props: { title: 'B', tags: ['x'], id: 'g2' } },
+      ]);
+    });
+
+    it('should leave opportunityId-keyed rows for the server to key', async () => {
+      const { sent, connection } = fakeConnection([{ id: 'OPP-1' }, { id: 'x_y' }]);
+
+      const ids = await new NodeCrud(connection).bulkMerge('Opportunity', [
+        { properties: { opportunityId: 'OPP-1' } },
+        { id: 'x_y', properties: { title: 'Y', agencyName: 'X' } },
+      ]);
+
+      expect(ids).toEqual(['OPP-1', 'x_y']);
+      expect(sent[0].query).toContain('coalesce(r.id, r.opportunityId)');
+      expect(sent[0].params.rows).toEqual([
+        { opportunityId: 'OPP-1' },
+        { title: 'Y', agencyName: 'X', id: 'x_y' },
+      ]);
+    });
+
+    it('should reject only the group with an invalid label', async () => {
+      const { sent, connection } = fakeConnection([{ id: 'g1' }]);
+
+      const [grants, bad] = await new NodeCrud(connection).upsertNodeGroups([
+        ['Grant', [{ id: 'g1', properties: {} }]],
+        ['Bad) DETACH DELETE (x', [{ id: 'x1', properties: {} }]],
+      ]);
+
+      expect(grants).toEqual({ status: 'fulfilled', value: ['g1'] });
+      expect(bad.status).toBe('rejected');
+      expect(sent).toHaveLength(1);
+    });
+
+    it('should skip the round-trip for an empty batch', async () => {
+      const { execute, connection } = fakeConnection();
+      await expect(new NodeCrud(connection).upsertNodes('Grant', [])).resolves.toEqual([]);
+      expect(execute).not.toHaveBeenCalled();
+    });
+  });
+
+  describe('getNode routing', () => {
+    it('should read from the primary unless stale reads are allowed', async () => {
+      const execute = jest.fn(async () => []);
+      const executeRead = jest.fn(async () => []);
+      const crud = new NodeCrud({ execute, executeRead } as unknown as GraphConnection);
+
+      await crud.getNode('g1');
+      expect(execute).toHaveBeenCalledTimes(1);
+      expect(executeRead).not.toHaveBeenCalled();
+
+      await crud.getNode('g1', { allowStale: true });
+      expect(executeRead).toHaveBeenCalledTimes(1);
+    });
+  });
+
+  describe('getNode decoding', () => {
+    it('should parse JSON object strings and leave other strings alone', async () => {
+      const properties = {
+        id: 'g1',
+        meta: '{"source":"grants.gov"}',
+        empty: '{}',
+        braces: '{draft}',
+        title: 'Plain title',
+      };
+      const { connection } = fakeConnection([{ n: { properties } }]);
+
+      const node = await new NodeCrud(connection).getNode('g1');
+
+      expect(node).toEqual({
+        id: 'g1',
+        meta: { source: 'grants.gov' },
+        empty: {},
+        braces: '{draft}',
+        title: 'Plain title',
+      });
+    });
+
+    it('should return nodes as GenericNode instances with id first', async () => {
+      const { connection } = fakeConnection([{ n: { labels: ['Grant'], properties: { title: 'A', id: 'g1' } } }]);
+
+      const node = await new NodeCrud(connection).getNode('g1');
+
+      expect(node).toBeInstanceOf(GenericNode);
+      expect(Object.keys(node!)).toEqual(['id', 'title']);
+    });
+
+    it('should fold flattened amount fields back into one object', async () => {
+      const properties = { id: 'o1', amountMin: 100, amountMax: 500, amountCurrency: 'USD', locationState: 'HI' };
+      const { connection } = fakeConnection([{ n: { properties } }]);
+
+      const node = await new NodeCrud(connection).getNode('o1');
+
+      expect(node).toEqual({
+        id: 'o1',
+        locationState: 'HI',
+        amount: { min: 100, max: 500, currency: 'USD' },
+      });
+    });
+  });
+
+  describe('Property serialization', () => {
+    it('should re-encode a field whose type changes between calls', async () => {
+      const { sent, connection } = fakeConnection();
+      const crud = new NodeCrud(connection);
+      const when = new Date('2025-01-01T00:00:00.000Z');
+
+      await crud.upsertNode('Opportunity', 'o1', { deadline: '2025-01-01', extra: { a: 1 }, tags: ['x'] });
+      await crud.upsertNode('Opportunity', 'o2', { deadline: when, extra: null, tags: ['y'] });
+
+      expect(sent[0].params.props).toEqual({
+        deadline: '2025-01-01', extra: '{"a":1}', tags: ['x'], id: 'o1',
+      });
+      expect(sent[1].params.props).toEqual({
+        deadline: '2025-01-01T00:00:00.000Z', tags: ['y'], id: 'o2',
+      });
+    });
+
+    it('should add the id without touching the caller\'s properties', async () => {
+      const { sent, connection } = fakeConnection();
+      const properties = { title: 'A' };
+
+      await new NodeCrud(connection).upsertNode('Grant', 'g1', properties);
+
+      expect(sent[0].params.props).toEqual({ title: 'A', id: 'g1' });
+      expect(properties).toEqual({ title: 'A' });
+    });
+  });
+});
@@ -1,31 +1,120 @@
 import { FalkorDB } from 'falkordb';
+import { createPool, Pool } from 'generic-pool';
+
+const RETRY_BACKOFF_MS = 1000;
+const CONNECTION_ERROR = /ECONNRESET|ECONNREFUSED|EPIPE|client is closed|socket closed/i;
+// Failures raised before the command left the client; anything else may already have run
+const NOT_SENT_ERROR = /ECONNREFUSED|client is closed/i;
+
+function errorText(error: any): string {
+  return `${error?.code ?? ''} ${error?.message ?? ''}`;
+}
+
+function isConnectionError(error: any): boolean {
+  return CONNECTION_ERROR.test(errorText(error));
+}
+
+export interface PipelinedQuery {
+  query: string;
+  params?: Record<string, any>;
+}
+
+export interface ExecuteOptions {
+  // Safe to run twice (MERGE, SET, reads): a dropped socket mid-query is retried too
+  idempotent?: boolean;
+}
+
+// Driver capabilities are fixed per install, so pick the connect/close strategy once
+const openFalkorClient: (url: string) => Promise<any> =
+  typeof (FalkorDB as any).connect === 'function'
+    ? (url) => (FalkorDB as any).connect({ url })
+    : async (url) => {
+        const client: any = new (FalkorDB as any)();
+        if (typeof client.connect === 'function') await client.connect({ url });
+        return client;
+      };
+
+const falkorProto = (FalkorDB as any).prototype ?? {};
+const closeFalkorClient: (client: any) => Promise<void> =
+  typeof falkorProto.close === 'function' ? (client) => client.close()
+  : typeof falkorProto.quit === 'function' ? (client) => client.quit()
+  : typeof falkorProto.disconnect === 'function' ? (client) => client.disconnect()
+  : async () => {};
+
+const MAX_LOGGED_PARAMS = 512;
+const MAX_LOGGED_ITEMS = 3;
+
+// Trims arrays and long strings while stringifying, so only a bounded slice is ever serialized
+function briefReplacer(_key: string, value: any): any {
+  if (Array.isArray(value) && value.length > MAX_LOGGED_ITEMS) {
+    return [...value.slice(0, MAX_LOGGED_ITEMS), `…(${value.length} items)`];
+  }
+  if (typeof value === 'string' && value.length > MAX_LOGGED_PARAMS) {
+    return `${value.slice(0, MAX_LOGGED_PARAMS)}…(${value.length} chars)`;
+  }
+  return value;
+}
+
+/**
+ * Params for error logs, capped so a failing UNWIND batch can't flood CPU/heap.
+ */
+function briefParams(params: Record<string, any>): string {
+  const s = JSON.stringify(params, briefReplacer);
+  return s.length > MAX_LOGGED_PARAMS ? `${s.slice(0, MAX_LOGGED_PARAMS)}…` : s;
+}
+
+/**
+ * A pooled FalkorDB client with its graph handle resolved once at creation.
+ */
+interface PooledGraph {
+  client: any;
+  graph: any;
+}
 
 /**
  * GraphConnection - Singleton
  * Hardened to prevent connection exhaustion and handle driver quirks.
+ * Queries are spread over a pool of warm clients so concurrent callers
+ * don't queue behind a single socket. Read-only traffic that tolerates
+ * replica lag (health checks, opt-in stale lookups) gets its own smaller
+ * pool so it never waits behind writes.
  */
 export class GraphConnection {
   private static instance: GraphConnection;
-  
-  // Use 'any' for the client to bypass version-specific type mismatches
-  private client: any = null;
-  private graph: any = null;
+
+  private pool: Pool<PooledGraph> | null = null;
+  private readPool: Pool<PooledGraph> | null = null;
   private isConnected: boolean = false;
-  
-  private config: { url: string; graphName: string };
+  // In-flight connect, shared so concurrent cold-start callers open one set of pools
+  private connectPromise: Promise<void> | null = null;
+  private lastRetryAt = 0;
+
+  private config: {
+    url: string;
+    readUrl: string;
+    graphName: string;
+    poolMin: number;
+    poolMax: number;
+    readPoolMax: number;
+  };
 
   private constructor() {
     const host = process.env.FALKORDB_HOST || 'localhost';
     const port = process.env.FALKORDB_PORT || '6379';
     const pass = process.env.FALKORDB_PASSWORD;
-    
+
     let url = process.env.FALKORDB_URL;
     if (!url) {
       url = pass ? `redis://:${pass}@${host}:${port}` : `redis://${host}:${port}`;
     }
-    
+    // Point at a replica to take reads off the primary entirely
+    const readUrl = process.env.FALKORDB_READ_URL || url;
+
     const graphName = process.env.FALKORDB_GRAPH || 'AlmonerGraph';
-    this.config = { url, graphName };
+    const poolMin = parseInt(process.env.FALKORDB_POOL_MIN || '2', 10);
+    const poolMax = parseInt(process.env.FALKORDB_POOL_MAX || '16', 10);
+    const readPoolMax = parseInt(process.env.FALKORDB_READ_POOL_MAX || '4', 10);
+    this.config = { url, readUrl, graphName, poolMin, poolMax, readPoolMax };
   }
 
   public static getInstance(): GraphConnection {
@@ -36,64 +125,208 @@ export class GraphConnection {
   }
 
   async connect(): Promise<void> {
-    if (this.isConnected && this.client) return;
+    if (this.isConnected && this.pool) return;
+    if (!this.connectPromise) {
+      this.connectPromise = this.doConnect().finally(() => {
+        this.connectPromise = null;
+      });
+    }
+    return this.connectPromise;
+  }
 
+  private async doConnect(): Promise<void> {
     try {
-      console.log(`🔌 Connecting to FalkorDB at ${this.config.url}...`);
-
-      // Hybrid Detection Strategy for Driver
-      if (typeof (FalkorDB as any).connect === 'function') {
-        this.client = await (FalkorDB as any).connect({ url: this.config.url });
-      } else {
-        this.client = new FalkorDB();
-        if (typeof this.client.connect === 'function') {
-             await this.client.connect({ url: this.config.url });
-        }
-      }
+      if (process.env.DEBUG) console.log(`🔌 Connecting to FalkorDB at ${this.config.url}...`);
+
+      this.pool = this.createGraphPool(this.config.url, this.config.poolMin, this.config.poolMax);
+      this.readPool = this.createGraphPool(this.config.readUrl, 1, this.config.readPoolMax);
+
+      // Prove the URLs/credentials work before reporting connected
+      await Promise.all([this.pool, this.readPool].map(async (pool) => {
+        const probe = await pool.acquire();
+        await pool.release(probe);
+      }));
 
-      // Select Graph
-      if (typeof this.client.selectGraph === 'function') {
-        this.graph = this.client.selectGraph(this.config.graphName);
-      } else {
-        throw new Error("Client does not support selectGraph method");
-      }
-      
       this.isConnected = true;
-      console.log(`✅ Connected to Graph: "${this.config.graphName}"`);
+      if (process.env.DEBUG) console.log(`✅ Connected to Graph: "${this.config.graphName}" (pool ${this.config.poolMin}-${this.config.poolMax})`);
 
     } catch (error) {
       console.error('❌ FalkorDB Connection Failed:', error);
+      await this.drainPools();
       throw error;
     }
   }
 
-  async execute(query: string, params: Record<string, any> = {}): Promise<any[]> {
-    if (!this.isConnected || !this.graph) {
-        await this.connect();
+  async execute(
+    query: string,
+    params: Record<string, any> = {},
+    options: ExecuteOptions = {}
+  ): Promise<any[]> {
+    // Assume the pool is healthy; only a dead socket earns a second attempt
+    if (!this.isConnected) await this.connect();
+    return this.executeOn(this.pool!, query, params, false, options.idempotent ?? false);
+  }
+
+  /**
+   * Run a read-only query on the read pool (GRAPH.RO_QUERY where the driver
+   * supports it), so it never queues behind writers. The read pool may point
+   * at an asynchronous replica: use it only where a just-written node may be
+   * missing.
+   */
+  async executeRead(query: string, params: Record<string, any> = {}): Promise<any[]> {
+    if (!this.isConnected) await this.connect();
+    return this.executeOn(this.readPool!, query, params, true, true);
+  }
+
+  /**
+   * Fire several independent queries in the same tick on one pooled client.
+   * node-redis coalesces commands issued together into one pipelined write,
+   * so this costs ~1 RTT. Each query settles on its own; results line up
+   * with the input. Batched statements must be idempotent (UNWIND MERGE,
+   * schema DDL): queries lost to a dropped socket are retried once.
+   */
+  async pipeline(queries: Array<string | PipelinedQuery>): Promise<PromiseSettledResult<any[]>[]> {
+    if (!this.isConnected) await this.connect();
+
+    const results = await this.pipelineOn(this.pool!, queries);
+    const dropped: number[] = [];
+    results.forEach((r, i) => {
+      if (r.status === 'rejected' && isConnectionError(r.reason)) dropped.push(i);
+    });
+    if (dropped.length === 0) return results;
+
+    const firstFailure = results[dropped[0]] as PromiseRejectedResult;
+    if (!this.shouldRetry(firstFailure.reason, true)) return results;
+
+    const retried = await this.pipelineOn(this.pool!, dropped.map((i) => queries[i]));
+    dropped.forEach((i, j) => {
+      results[i] = retried[j];
+    });
+    return results;
+  }
+
+  async close(): Promise<void> {
+    await this.drainPools();
+  }
+
+  private async executeOn(
+    pool: Pool<PooledGraph>,
+    query: string,
+    params: Record<string, any>,
+    readOnly: boolean,
+    idempotent: boolean
+  ): Promise<any[]> {
+    try {
+      return await this.withClient(pool, (conn) => this.runQuery(conn, query, params, readOnly));
+    } catch (error) {
+      if (!this.shouldRetry(error, idempotent)) throw error;
+      return this.withClient(pool, (conn) => this.runQuery(conn, query, params, readOnly));
+    }
+  }
+
+  /**
+   * allSettled never throws, so withClient would release a dead socket back
+   * to the pool; inspect the settled results instead.
+   */
+  private async pipelineOn(
+    pool: Pool<PooledGraph>,
+    queries: Array<string | PipelinedQuery>
+  ): Promise<PromiseSettledResult<any[]>[]> {
+    const conn = await pool.acquire();
+    const results = await Promise.allSettled(queries.map((q) =>
+      typeof q === 'string'
+        ? this.runQuery(conn, q, {}, false)
+        : this.runQuery(conn, q.query, q.params ?? {}, false)
+    ));
+    if (results.some((r) => r.status === 'rejected' && isConnectionError(r.reason))) {
+      await pool.destroy(conn);
+    } else {
+      await pool.release(conn);
+    }
+    return results;
+  }
+
+  private async withClient<T>(pool: Pool<PooledGraph>, fn: (conn: PooledGraph) => Promise<T>): Promise<T> {
+    const conn = await pool.acquire();
+    try {
+      const out = await fn(conn);
+      await pool.release(conn);
+      return out;
+    } catch (error) {
+      // Drop dead sockets instead of handing them to the next caller
+      if (isConnectionError(error)) await pool.destroy(conn);
+      else await pool.release(conn);
+      throw error;
     }
+  }
+
+  /**
+   * A CREATE that reached the server before the socket dropped would be
+   * written twice, so only idempotent queries retry past a mid-flight failure.
+   */
+  private shouldRetry(error: unknown, idempotent: boolean): boolean {
+    const retryable = idempotent ? isConnectionError(error) : NOT_SENT_ERROR.test(errorText(error));
+    const now = Date.now();
+    if (!retryable || now - this.lastRetryAt < RETRY_BACKOFF_MS) return false;
+    this.lastRetryAt = now;
+    return true;
+  }
 
+  private async runQuery(
+    conn: PooledGraph,
+    query: string,
+    params: Record<string, any>,
+    readOnly: boolean
+  ): Promise<any[]> {
     try {
-      const result = await this.graph.query(query, { params });
+      const result = readOnly && typeof conn.graph.roQuery === 'function'
+        ? await conn.graph.roQuery(query, { params })
+        : await conn.graph.query(query, { params });
       if (result && Array.isArray(result.data)) return result.data;
       if (Array.isArray(result)) return result;
-      return []; 
+      return [];
     } catch (error) {
-      console.error('❌ Query Failed:', { query, params: JSON.stringify(params), error });
+      console.error('❌ Query Failed:', { query, params: briefParams(params), error });
       throw error;
     }
   }
 
-  async close(): Promise<void> {
-    if (this.client) {
-      if (typeof this.client.close === 'function') await this.client.close();
-      else if (typeof this.client.quit === 'function') await this.client.quit();
-      else if (typeof this.client.disconnect === 'function') await this.client.disconnect();
-      
-      this.isConnected = false;
-      this.client = null;
+  private createGraphPool(url: string, min: number, max: number): Pool<PooledGraph> {
+    return createPool<PooledGraph>(
+      {
+        create: () => this.openClient(url),
+        destroy: (conn) => closeFalkorClient(conn.client),
+      },
+      {
+        min,
+        max,
+        // A failing factory would otherwise leave acquire() pending forever
+        acquireTimeoutMillis: 10000,
+      }
+    );
+  }
+
+  private async openClient(url: string): Promise<PooledGraph> {
+    const client = await openFalkorClient(url);
+
+    // Select Graph
+    if (typeof client.selectGraph !== 'function') {
+      throw new Error("Client does not support selectGraph method");
     }
+    return { client, graph: client.selectGraph(this.config.graphName) };
   }
-  
+
+  private async drainPools(): Promise<void> {
+    const pools = [this.pool, this.readPool].filter((p): p is Pool<PooledGraph> => p !== null);
+    this.pool = null;
+    this.readPool = null;
+    this.isConnected = false;
+    for (const pool of pools) {
+      await pool.drain();
+      await pool.clear();
+    }
+  }
+
   static createNew(): GraphConnection {
       return GraphConnection.getInstance();
   }
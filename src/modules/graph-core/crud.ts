@@ -1,15 +1,84 @@
-import { GraphConnection } from './connection';
-import { CodecRegistry } from './property-codecs';
+import { ExecuteOptions, GraphConnection, PipelinedQuery } from './connection';
+import { CodecRegistry, GenericNode } from './property-codecs';
+import { mapRows } from '../../utils';
+
+// Labels are interpolated into Cypher, so only plain identifiers are allowed
+const LABEL_PATTERN = /^[A-Za-z_][A-Za-z0-9_]*$/;
+
+const UPDATE_NODE_QUERY = `MATCH (n) WHERE n.id = $id SET n += $props`;
+const GET_NODE_QUERY = `MATCH (n) WHERE n.id = $id RETURN n`;
+
+// MERGE / SET writes can be replayed safely; CREATE must not be
+const IDEMPOTENT: ExecuteOptions = { idempotent: true };
+
+const OPEN_BRACE = 0x7b;
+const CLOSE_BRACE = 0x7d;
+
+/**
+ * Cheap pre-check before JSON.parse so plain strings never reach the throw path.
+ */
+function looksLikeJsonObject(value: string): boolean {
+  const n = value.length;
+  return n > 1 &&
+    value.charCodeAt(0) === OPEN_BRACE &&
+    value.charCodeAt(n - 1) === CLOSE_BRACE &&
+    (n === 2 || value.indexOf(':') > 0);
+}
+
+interface LabelQueries {
+  create: string;
+  upsert: string;
+  upsertMany: string;
+  bulkMerge: string;
+}
+
+export interface UpsertRow {
+  id: string;
+  properties: Record<string, any>;
+}
+
+/**
+ * A bulkMerge row. Leave `id` unset to have the server key the node by its opportunityId.
+ */
+export interface MergeRow {
+  id?: string;
+  properties: Record<string, any>;
+}
 
 export class NodeCrud {
+  // Identical query text per label keeps FalkorDB's plan cache warm
+  private static queryCache = new Map<string, LabelQueries>();
+
   constructor(private connection: GraphConnection) {}
 
-  private serializeProperties(label: string, props: Record<string, any>): Record<string, any> {
+  private static queriesFor(label: string): LabelQueries {
+    let queries = NodeCrud.queryCache.get(label);
+    if (!queries) {
+      if (!LABEL_PATTERN.test(label)) {
+        throw new Error(`Invalid node label: ${label}`);
+      }
+      queries = {
+        create: `CREATE (n:${label}) SET n = $props RETURN n.id as id`,
+        upsert: `MERGE (n:${label} {id: $id}) ON CREATE SET n = $props ON MATCH SET n += $props RETURN n.id as id`,
+        upsertMany: `UNWIND $rows AS r MERGE (n:${label} {id: r.id}) ON CREATE SET n = r.props ON MATCH SET n += r.props RETURN n.id as id`,
+        bulkMerge: `UNWIND $rows AS r WITH r, coalesce(r.id, r.opportunityId) AS id MERGE (n:${label} {id: id}) ON CREATE SET n = r, n.id = id ON MATCH SET n += r RETURN n.id as id`,
+      };
+      NodeCrud.queryCache.set(label, queries);
+    }
+    return queries;
+  }
+
+  /**
+   * Encode props for FalkorDB. A separate `id` is written last so callers
+   * never have to clone their properties just to add it.
+   */
+  private serializeProperties(label: string, props: Record<string, any>, id?: string): Record<string, any> {
     const codec = CodecRegistry.getCodec(label);
     const flattened = codec.encode(props);
     const serialized: Record<string, any> = {};
-    
-    for (const [key, value] of Object.entries(flattened)) {
+
+    for (const key in flattened) {
+      const value = flattened[key];
       if (value === undefined || value === null) continue;
 
       if (Array.isArray(value)) {
@@ -24,14 +93,15 @@ export class NodeCrud {
         serialized[key] = value;
       }
     }
+    if (id !== undefined) serialized.id = id;
     return serialized;
   }
 
-  async createNode(label: string, properties: Record<string, any>): Promise<string> {
-    const query = `CREATE (n:${label}) SET n = $props RETURN n.id as id`;
-    const params = { props: this.serializeProperties(label, properties) };
-    const result = await this.connection.execute(query, params);
-    return result[0]['id']; 
+  async createNode(label: string, properties: Record<string, any>, id?: string): Promise<string> {
+    const query = NodeCrud.queriesFor(label).create;
+    const props = this.serializeProperties(label, properties, id);
+    const result = await this.connection.execute(query, { props });
+    return result[0]['id'];
   }
 
   async updateNode(id: string, properties: Record<string, any>): Promise<void> {
@@ -39,41 +109,101 @@ export class NodeCrud {
       id, 
       props: this.serializeProperties('Generic', properties) 
     };
-    const query = `MATCH (n) WHERE n.id = $id SET n += $props`;
-    await this.connection.execute(query, params);
+    await this.connection.execute(UPDATE_NODE_QUERY, params, IDEMPOTENT);
   }
 
   async upsertNode(label: string, id: string, properties: Record<string, any>): Promise<string> {
-    const safeProps = this.serializeProperties(label, { ...properties, id });
-    
-    const query = `
-      MERGE (n:${label} {id: $id})
-      ON CREATE SET n = $props
-      ON MATCH SET n += $props
-      RETURN n.id as id
-    `;
-    
-    const params = { id, props: safeProps };
-    const result = await this.connection.execute(query, params);
+    const query = NodeCrud.queriesFor(label).upsert;
+    const props = this.serializeProperties(label, properties, id);
+    const result = await this.connection.execute(query, { id, props }, IDEMPOTENT);
     return result[0]['id'];
   }
 
-  async getNode(id: string): Promise<Record<string, any> | null> {
-    const query = `MATCH (n) WHERE n.id = $id RETURN n`;
-    const result = await this.connection.execute(query, { id });
+  /**
+   * Upsert many nodes of one label in a single round-trip.
+   */
+  async upsertNodes(label: string, rows: UpsertRow[]): Promise<string[]> {
+    if (rows.length === 0) return [];
+
+    const query = NodeCrud.queriesFor(label).upsertMany;
+    const params = { rows: this.serializeRows(label, rows) };
+    const result = await this.connection.execute(query, params, IDEMPOTENT);
+    return mapRows(result, (row) => row['id']);
+  }
+
+  /**
+   * Upsert batches for several labels in one pipelined round-trip. Each group
+   * settles on its own, so an invalid label or failed query only rejects that
+   * group. Fulfilled groups carry their IDs in input order.
+   */
+  async upsertNodeGroups(groups: Array<[string, UpsertRow[]]>): Promise<PromiseSettledResult<string[]>[]> {
+    const settled = new Array<PromiseSettledResult<string[]>>(groups.length);
+    const queries: PipelinedQuery[] = [];
+    const slots: number[] = [];
+
+    groups.forEach(([label, rows], i) => {
+      try {
+        queries.push({ query: NodeCrud.queriesFor(label).upsertMany, params: { rows: this.serializeRows(label, rows) } });
+        slots.push(i);
+      } catch (reason) {
+        settled[i] = { status: 'rejected', reason };
+      }
+    });
+    if (queries.length === 0) return settled;
+
+    const results = await this.connection.pipeline(queries);
+    results.forEach((result, j) => {
+      settled[slots[j]] = result.status === 'fulfilled'
+        ? { status: 'fulfilled', value: mapRows(result.value, (row) => row['id']) }
+        : result;
+    });
+    return settled;
+  }
+
+  /**
+   * Ingest-path UNWIND MERGE where the id is resolved in Cypher, so rows
+   * keyed by opportunityId need no client-side id at all.
+   * Returns the node IDs in input order.
+   */
+  async bulkMerge(label: string, rows: MergeRow[]): Promise<string[]> {
+    if (rows.length === 0) return [];
+
+    const query = NodeCrud.queriesFor(label).bulkMerge;
+    const params = { rows: mapRows(rows, ({ id, properties }) => this.serializeProperties(label, properties, id)) };
+    const result = await this.connection.execute(query, params, IDEMPOTENT);
+    return mapRows(result, (row) => row['id']);
+  }
+
+  private serializeRows(label: string, rows: UpsertRow[]): Array<{ id: string; props: Record<string, any> }> {
+    return mapRows(rows, ({ id, properties }) => ({
+      id,
+      props: this.serializeProperties(label, properties, id),
+    }));
+  }
+
+  /**
+   * Read a node from the primary, so it sees writes that just completed.
+   * Pass `allowStale` to read from the (possibly lagging) read replica instead.
+   */
+  async getNode(id: string, options: { allowStale?: boolean } = {}): Promise<GenericNode | null> {
+    const result = options.allowStale
+      ? await this.connection.executeRead(GET_NODE_QUERY, { id })
+      : await this.connection.execute(GET_NODE_QUERY, { id }, IDEMPOTENT);
     if (result.length === 0) return null;
     
-    const rawProps = result[0]['n'].properties;
+    const node = result[0]['n'];
+    const rawProps = node.properties;
     const deserialized: Record<string, any> = {};
     
     for (const [key, value] of Object.entries(rawProps)) {
       // Decode fallback JSON strings
-      if (typeof value === 'string' && value.startsWith('{') && value.endsWith('}')) {
+      if (typeof value === 'string' && looksLikeJsonObject(value)) {
         try { deserialized[key] = JSON.parse(value); } catch { deserialized[key] = value; }
       } else {
         deserialized[key] = value;
       }
     }
-    return CodecRegistry.getCodec('Generic').decode(deserialized);
+    const codec = CodecRegistry.getCodec(node.labels?.[0] ?? 'Generic');
+    return new (codec.nodeCtor ?? GenericNode)(codec.decode(deserialized));
   }
 }
\ No newline at end of file
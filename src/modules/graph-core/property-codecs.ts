@@ -1,8 +1,34 @@
+/**
+ * Default shape for decoded nodes. Assigning `id` first in one constructor
+ * gives nodes a shared hidden-class prefix, so downstream reads of `node.id`
+ * stay monomorphic.
+ */
+export class GenericNode {
+  id!: string;
+  [key: string]: any;
+
+  constructor(props: Record<string, any>) {
+    this.id = props.id;
+    Object.assign(this, props);
+  }
+}
+
+export type NodeCtor = new (props: Record<string, any>) => GenericNode;
+
 interface PropertyCodec {
   encode: (props: Record<string, any>) => Record<string, any>;
   decode: (props: Record<string, any>) => Record<string, any>;
+  // Label-specific class for decoded nodes; GenericNode when unset
+  nodeCtor?: NodeCtor;
 }
 
+const AMOUNT_KEYS = new Set(['amountMin', 'amountMax', 'amountCurrency']);
+const LOCATION_KEYS = new Set(['locationLat', 'locationLng', 'locationState']);
+
+// Catch accidental mutation of decoded values in development; freezing isn't free, so skip it in production
+const devFreeze: <T extends object>(value: T) => T =
+  process.env.NODE_ENV === 'production' ? (value) => value : (value) => Object.freeze(value);
+
 const StandardCodec: PropertyCodec = {
   encode: (props) => {
     const flattened: Record<string, any> = {};
@@ -29,32 +55,37 @@ const StandardCodec: PropertyCodec = {
   },
 
   decode: (props) => {
-    const reconstructed: Record<string, any> = { ...props };
+    const hasAmount = 'amountMin' in props || 'amountMax' in props;
+    const hasLocation = 'locationLat' in props || 'locationLng' in props;
+
+    // Build only the final keys: spread-then-delete walks the object through
+    // a hidden-class transition per deleted key
+    const reconstructed: Record<string, any> = {};
+    for (const key in props) {
+      if (hasAmount && AMOUNT_KEYS.has(key)) continue;
+      if (hasLocation && LOCATION_KEYS.has(key)) continue;
+      reconstructed[key] = props[key];
+    }
     // Rehydrate Amount
-    if ('amountMin' in props || 'amountMax' in props) {
-      reconstructed['amount'] = {
+    if (hasAmount) {
+      reconstructed['amount'] = devFreeze({
         min: props['amountMin'],
         max: props['amountMax'],
         currency: props['amountCurrency']
-      };
-      delete reconstructed['amountMin'];
-      delete reconstructed['amountMax'];
-      delete reconstructed['amountCurrency'];
+      });
     }
     // Rehydrate Location
-    if ('locationLat' in props || 'locationLng' in props) {
-      reconstructed['location'] = {
+    if (hasLocation) {
+      reconstructed['location'] = devFreeze({
         lat: props['locationLat'],
         lng: props['locationLng'],
         state: props['locationState']
-      };
-      delete reconstructed['locationLat'];
-      delete reconstructed['locationLng'];
-      delete reconstructed['locationState'];
+      });
     }
     return reconstructed;
   }
 };
+Object.freeze(StandardCodec);
 
 export const CodecRegistry = {
   getCodec: (label: string): PropertyCodec => { return StandardCodec; }
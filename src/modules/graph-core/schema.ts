@@ -38,19 +38,17 @@ export class SchemaManager {
         );
     };
 
-    for (const idx of DESIRED_INDEXES) {
-      if (!exists(idx.label, idx.property)) {
-        try {
-            await this.connection.execute(`CREATE INDEX FOR (n:${idx.label}) ON (n.${idx.property})`);
-        } catch (e) { console.warn(e); }
-      }
-    }
+    const indexStmts = DESIRED_INDEXES
+      .filter((idx) => !exists(idx.label, idx.property))
+      .map((idx) => `CREATE INDEX FOR (n:${idx.label}) ON (n.${idx.property})`);
+    const fulltextStmts = DESIRED_FULLTEXT
+      .map((idx) => `CALL db.idx.fulltext.createNodeIndex('${idx.label}', '${idx.property}')`);
 
-    for (const idx of DESIRED_FULLTEXT) {
-      try {
-        await this.connection.execute(`CALL db.idx.fulltext.createNodeIndex('${idx.label}', '${idx.property}')`);
-      } catch (e: any) { }
-    }
+    // Fulltext failures (index already present) are expected and stay silent
+    const results = await this.connection.pipeline([...indexStmts, ...fulltextStmts]);
+    results.slice(0, indexStmts.length).forEach((r) => {
+      if (r.status === 'rejected') console.warn(r.reason);
+    });
   }
 
   private async ensureConstraints(): Promise<void> {
@@ -65,12 +63,11 @@ export class SchemaManager {
         );
     };
 
-    for (const c of DESIRED_CONSTRAINTS) {
-      if (!exists(c.label, c.property)) {
-        try {
-            await this.connection.execute(`CREATE CONSTRAINT FOR (n:${c.label}) REQUIRE n.${c.property} IS UNIQUE`);
-        } catch (e: any) {}
-      }
-    }
+    // Constraints need their backing indexes, so this batch runs after ensureIndexes
+    await this.connection.pipeline(
+      DESIRED_CONSTRAINTS
+        .filter((c) => !exists(c.label, c.property))
+        .map((c) => `CREATE CONSTRAINT FOR (n:${c.label}) REQUIRE n.${c.property} IS UNIQUE`)
+    );
   }
 }
\ No newline at end of file
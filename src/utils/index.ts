@@ -108,6 +108,17 @@ export function chunk<T>(array: T[], size: number): T[][] {
   return result;
 }
 
+/**
+ * Map query rows into an array sized up front, so it never grows while filling.
+ */
+export function mapRows<T, R>(rows: T[], fn: (row: T) => R): R[] {
+  const out = new Array<R>(rows.length);
+  for (let i = 0; i < rows.length; i++) {
+    out[i] = fn(rows[i]);
+  }
+  return out;
+}
+
 /**
  * Deduplicate an array by a key function.
  */